@@ -1,13 +1,26 @@
+import functools
+import os
 from pathlib import Path
 
 
+_TRUTHY = frozenset({"1", "true", "yes", "y", "on"})
+_MAX_TRUTHY_LEN = max(map(len, _TRUTHY))
+
+
 def _is_truthy(value: str | None) -> bool:
     if not value:
         return False
-    return value.strip().lower() in {"1", "true", "yes", "y", "on"}
+    stripped = value.strip()
+    # No truthy token is longer than this, so longer inputs skip the
+    # lowercasing allocation entirely.
+    if len(stripped) > _MAX_TRUTHY_LEN:
+        return False
+    return stripped.lower() in _TRUTHY
 
 
-def _find_local_repo_root(start: Path) -> Path | None:
+@functools.lru_cache(maxsize=8)
+def _find_local_repo_root_cached(start_str: str) -> Path | None:
+    start = Path(start_str)
     if start.is_file():
         start = start.parent
 
@@ -19,50 +32,87 @@ def _find_local_repo_root(start: Path) -> Path | None:
     return None
 
 
+def _find_local_repo_root(start: Path) -> Path | None:
+    # Walking every parent costs two stat() calls per level; memoize per
+    # starting path so repeated lookups become a dict hit.
+    return _find_local_repo_root_cached(str(start))
+
+
+# Resolved once at import; __file__ never changes during the process.
+_THIS_FILE_RESOLVED = Path(os.path.realpath(__file__))
+
+
+@functools.lru_cache(maxsize=4)
+def _find_repo_root_from_cwd(cwd: str) -> Path | None:
+    return _find_local_repo_root(Path(os.path.realpath(cwd)))
+
+
+@functools.lru_cache(maxsize=8)
+def _resolve_explicit_repo_root(explicit_path: str) -> Path | None:
+    candidate = Path(explicit_path).expanduser().resolve()
+    if candidate.is_dir():
+        return candidate
+    return None
+
+
 def _resolve_local_repo_root(explicit_path: str | None) -> Path | None:
     if explicit_path:
-        candidate = Path(explicit_path).expanduser().resolve()
-        if candidate.is_dir():
-            return candidate
-        return None
+        return _resolve_explicit_repo_root(explicit_path)
 
-    cwd_root = _find_local_repo_root(Path.cwd().resolve())
+    cwd_root = _find_repo_root_from_cwd(os.getcwd())
     if cwd_root:
         return cwd_root
 
-    file_root = _find_local_repo_root(Path(__file__).resolve())
+    file_root = _find_local_repo_root(_THIS_FILE_RESOLVED)
     if file_root:
         return file_root
 
     return None
 
 
+_UV_SOURCE_NAMES = ("crewai", "crewai-tools", "crewai-files")
+
+
 def _build_uv_sources(repo_root: Path) -> dict[str, Path]:
-    candidates = {
-        "crewai": repo_root / "lib" / "crewai",
-        "crewai-tools": repo_root / "lib" / "crewai-tools",
-        "crewai-files": repo_root / "lib" / "crewai-files",
-    }
+    # One scandir of lib/ replaces a stat() per candidate package.
+    found: dict[str, Path] = {}
+    try:
+        with os.scandir(repo_root / "lib") as entries:
+            for entry in entries:
+                if entry.name in _UV_SOURCE_NAMES and entry.is_dir():
+                    found[entry.name] = Path(entry.path)
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
 
-    return {name: path for name, path in candidates.items() if path.is_dir()}
+    return {name: found[name] for name in _UV_SOURCE_NAMES if name in found}
+
+
+_UV_SOURCES_MARKER = b"[tool.uv.sources]"
 
 
 def _append_uv_sources(pyproject_path: Path, sources: dict[str, Path]) -> bool:
     if not sources:
         return False
 
-    if not pyproject_path.exists():
+    try:
+        f = open(pyproject_path, "rb+")
+    except FileNotFoundError:
         return False
 
-    content = pyproject_path.read_text()
-    if "[tool.uv.sources]" in content:
-        return False
-
-    lines = ["", "[tool.uv.sources]"]
-    for name, path in sources.items():
-        lines.append(
+    with f:
+        # Scan for an existing section in chunks instead of slurping the whole
+        # file; the overlap keeps a marker split across chunks detectable.
+        tail = b""
+        while chunk := f.read(65536):
+            if _UV_SOURCES_MARKER in tail + chunk:
+                return False
+            tail = chunk[-(len(_UV_SOURCES_MARKER) - 1) :]
+
+        # Already at EOF, so only the new section gets written.
+        entries = "\n".join(
             f'{name} = {{ path = "{path.as_posix()}", editable = true }}'
+            for name, path in sources.items()
         )
-
-    pyproject_path.write_text(content.rstrip() + "\n" + "\n".join(lines) + "\n")
+        prefix = "\n" if tail.endswith(b"\n") else "\n\n"
+        f.write(f"{prefix}[tool.uv.sources]\n{entries}\n".encode())
     return True
@@ -1,22 +1,82 @@
 from __future__ import annotations
 
+import contextlib
+import functools
+import hashlib
+from itertools import chain
 import json
 import os
+import selectors
 import shutil
+import signal
 import subprocess
-import tempfile
+import threading
+import time
 from typing import TYPE_CHECKING, Any
 
 from pydantic import BaseModel
 
 from crewai.llms.base_llm import BaseLLM
 
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _dumps(value: Any) -> bytes:
+    if HAS_ORJSON:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
 if TYPE_CHECKING:
-    from crewai.task import Task
     from crewai.agent.core import Agent
+    from crewai.task import Task
     from crewai.utilities.types import LLMMessage
 
 
+_PERSISTENT_ENV_VAR = "CREWAI_CODEX_PERSISTENT"
+
+# Environment passed to codex children. execve copies every KEY=VALUE pair
+# into the new process, and CrewAI parents (poetry, conda, CI) often carry
+# hundreds of entries codex never reads.
+_CHILD_ENV_KEEP = frozenset(
+    {
+        "PATH",
+        "HOME",
+        "USER",
+        "LANG",
+        "TERM",
+        "TMPDIR",
+        "SSL_CERT_FILE",
+        "SSL_CERT_DIR",
+        "HTTP_PROXY",
+        "HTTPS_PROXY",
+        "NO_PROXY",
+        "http_proxy",
+        "https_proxy",
+        "no_proxy",
+    }
+)
+_CHILD_ENV_PREFIXES = ("CODEX_", "OPENAI_", "LC_")
+
+
+@functools.lru_cache(maxsize=32)
+def _resolve_codex_binary(codex_path: str) -> str | None:
+    """Resolve the codex binary once per path; `shutil.which` walks $PATH."""
+    return shutil.which(codex_path)
+
+
+@functools.lru_cache(maxsize=64)
+def _model_schema_bytes(response_model: type[BaseModel]) -> bytes:
+    """JSON schema bytes for a Pydantic model; deterministic per class."""
+    return _dumps(response_model.model_json_schema())
+
+
 class CodexCLICompletion(BaseLLM):
     """Codex CLI-based completion provider.
 
@@ -27,6 +87,9 @@ class CodexCLICompletion(BaseLLM):
         - This does not support CrewAI tool calling. Any provided tools are ignored.
         - Set Codex config via `codex_config_overrides` or environment (~/.codex/config.toml).
         - You can pass a JSON schema via `response_model` and Codex will try to comply.
+        - `codex_prompt_cache=True` passes a `prompt_cache_key` config override
+          derived from the conversation prefix so the provider can reuse cached
+          state across consecutive turns.
     """
 
     def __init__(
@@ -41,6 +104,7 @@ class CodexCLICompletion(BaseLLM):
         codex_sandbox: str | None = None,
         codex_full_auto: bool = False,
         codex_dangerously_bypass_approvals_and_sandbox: bool = False,
+        codex_prompt_cache: bool = False,
         timeout: float | None = None,
         **kwargs: Any,
     ) -> None:
@@ -48,37 +112,62 @@ class CodexCLICompletion(BaseLLM):
         super().__init__(model=model, timeout=timeout, provider=provider, **kwargs)
 
         self.codex_path = codex_path or "codex"
-        if shutil.which(self.codex_path) is None:
+        resolved = _resolve_codex_binary(self.codex_path)
+        if resolved is None:
             raise FileNotFoundError(
                 f"Codex CLI not found: {self.codex_path}. Install it and ensure it's on PATH."
             )
+        # Store the absolute path so spawning skips another PATH walk.
+        self.codex_path = resolved
 
+        # Collapse duplicate override keys (last value wins) so codex never
+        # parses the same key twice.
+        if isinstance(codex_config_overrides, list):
+            codex_config_overrides = _dedupe_override_args(codex_config_overrides)
         self.codex_config_overrides = codex_config_overrides
         self.codex_cd = codex_cd
-        self.codex_add_dir = codex_add_dir or []
+        # realpath collapses duplicates that alias each other via symlinks;
+        # dict.fromkeys dedupes while preserving order.
+        self.codex_add_dir = list(
+            dict.fromkeys(os.path.realpath(p) for p in codex_add_dir or [])
+        )
         self.codex_skip_git_repo_check = codex_skip_git_repo_check
         self.codex_sandbox = codex_sandbox
         self.codex_full_auto = codex_full_auto
         self.codex_dangerously_bypass_approvals_and_sandbox = (
             codex_dangerously_bypass_approvals_and_sandbox
         )
+        self.codex_prompt_cache = codex_prompt_cache
         self.timeout = timeout
 
-    def call(
-        self,
-        messages: str | list[LLMMessage],
-        tools: list[dict[str, Any]] | None = None,
-        callbacks: list[Any] | None = None,
-        available_functions: dict[str, Any] | None = None,
-        from_task: Task | None = None,
-        from_agent: Agent | None = None,
-        response_model: type[BaseModel] | None = None,
-    ) -> str:
-        prompt = _messages_to_prompt(messages)
+        # Overrides are validated and serialized exactly once; call() only
+        # ever splices this tuple into argv.
+        self._overrides_args: tuple[str, ...] = tuple(
+            _format_codex_overrides(self.codex_config_overrides)
+        )
 
-        # Build codex exec command
-        cmd = [self.codex_path, "exec", "-m", self.model]
+        # All of these flags are immutable after construction, so the static
+        # portion of the argv is built exactly once.
+        self._cmd_prefix: tuple[str, ...] = tuple(self._build_static_cmd())
 
+        # Minimal child environment, snapshotted at construction time so
+        # later mutations of os.environ never leak into codex.
+        self._child_env: dict[str, str] = {
+            key: value
+            for key, value in os.environ.items()
+            if key in _CHILD_ENV_KEEP or key.startswith(_CHILD_ENV_PREFIXES)
+        }
+
+        # Optional persistent worker (CREWAI_CODEX_PERSISTENT=1) that keeps a
+        # single codex process alive across calls to amortize its startup.
+        # Once the protocol proves unusable we stop retrying, otherwise every
+        # call would pay a doomed fork+exec before falling back to one-shot.
+        self._worker: subprocess.Popen[bytes] | None = None
+        self._worker_unsupported = False
+        self._worker_lock = threading.Lock()
+
+    def _build_static_cmd(self) -> list[str]:
+        cmd: list[str] = []
         if self.codex_cd:
             cmd += ["--cd", self.codex_cd]
         if self.codex_skip_git_repo_check:
@@ -91,57 +180,354 @@ class CodexCLICompletion(BaseLLM):
             cmd.append("--dangerously-bypass-approvals-and-sandbox")
         for extra_dir in self.codex_add_dir:
             cmd += ["--add-dir", extra_dir]
+        cmd += self._overrides_args
+        return cmd
+
+    def call(
+        self,
+        messages: str | list[LLMMessage],
+        tools: list[dict[str, Any]] | None = None,
+        callbacks: list[Any] | None = None,
+        available_functions: dict[str, Any] | None = None,
+        from_task: Task | None = None,
+        from_agent: Agent | None = None,
+        response_model: type[BaseModel] | None = None,
+    ) -> str:
+        prompt = _messages_to_prompt(messages)
 
-        # Apply config overrides
-        cmd += _format_codex_overrides(self.codex_config_overrides)
+        if os.getenv(_PERSISTENT_ENV_VAR) == "1" and not self._worker_unsupported:
+            message = self._call_persistent(prompt, response_model)
+            if message is not None:
+                return message
+            # Worker mode unavailable or broken; fall through to one-shot.
 
-        # Response schema (optional)
-        schema_file = None
-        if response_model is not None:
-            schema_fd, schema_path = tempfile.mkstemp(suffix=".json")
-            schema_file = schema_path
-            with os.fdopen(schema_fd, "w") as f:
-                json.dump(response_model.model_json_schema(), f)
-            cmd += ["--output-schema", schema_file]
+        # Capture the final response through a pipe instead of a temp file so
+        # no transient payload ever touches disk. Everything after the first
+        # pipe runs under one try/finally so no fd or helper thread leaks,
+        # even when setup fails before the spawn.
+        out_read_fd, out_write_fd = os.pipe()
+        schema_read_fd = None
+        schema_writer = None
+        reader = None
+        prompt_writer = None
+        stderr_reader = None
+        stdin_read_fd = stdin_write_fd = None
+        stderr_read_fd = stderr_write_fd = None
+        captured = bytearray()
+        stderr_buf = bytearray()
 
-        # Capture final response into a temp file
-        output_path = None
         try:
-            with tempfile.NamedTemporaryFile(delete=False) as out_f:
-                output_path = out_f.name
-            cmd += ["--output-last-message", output_path]
-
-            result = subprocess.run(
-                cmd,
-                input=prompt,
-                text=True,
-                capture_output=True,
-                timeout=self.timeout,
+            # Response schema (optional), fed to codex through a second pipe.
+            # The writer runs in a thread so a schema larger than the pipe
+            # buffer cannot deadlock against the not-yet-reading child.
+            schema_args: tuple[str, ...] = ()
+            if response_model is not None:
+                schema_read_fd, schema_write_fd = os.pipe()
+                schema_args = ("--output-schema", f"/dev/fd/{schema_read_fd}")
+                # Serialization happens on the writer thread so it overlaps
+                # the fork+execve and codex's own startup instead of running
+                # ahead of the spawn on the critical path.
+                schema_writer = threading.Thread(
+                    target=_serialize_and_write_schema,
+                    args=(schema_write_fd, response_model),
+                    daemon=True,
+                )
+                schema_writer.start()
+
+            reader = threading.Thread(
+                target=_drain_and_close, args=(out_read_fd, captured), daemon=True
             )
+            reader.start()
 
-            if result.returncode != 0:
-                stderr = (result.stderr or "").strip()
-                stdout = (result.stdout or "").strip()
-                details = stderr or stdout or "codex exec failed"
-                raise RuntimeError(details)
+            # Assemble the full argv in one pass over tuple segments; the
+            # static prefix is precomputed in __init__.
+            cache_args: tuple[str, ...] = ()
+            if self.codex_prompt_cache:
+                cache_args = _prompt_cache_args(messages)
+            cmd = list(
+                chain(
+                    (self.codex_path, "exec", "-m", self.model),
+                    self._cmd_prefix,
+                    cache_args,
+                    ("--output-last-message", f"/dev/fd/{out_write_fd}"),
+                    schema_args,
+                )
+            )
 
-            if output_path and os.path.exists(output_path):
-                with open(output_path, "r", encoding="utf-8") as f:
-                    return f.read().strip()
+            stdin_read_fd, stdin_write_fd = os.pipe()
+            stderr_read_fd, stderr_write_fd = os.pipe()
 
-            # Fallback to stdout if output file missing
-            return (result.stdout or "").strip()
+            # Only the /dev/fd/N fds named in argv may survive the exec; the
+            # rest stay close-on-exec (os.pipe fds are non-inheritable by
+            # default).
+            os.set_inheritable(out_write_fd, True)
+            if schema_read_fd is not None:
+                os.set_inheritable(schema_read_fd, True)
+
+            # posix_spawn skips subprocess's Python-level Popen machinery:
+            # stdout goes straight to /dev/null in the child, so its chatter
+            # is discarded by the kernel without ever reaching userspace.
+            file_actions = [
+                (os.POSIX_SPAWN_DUP2, stdin_read_fd, 0),
+                (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0o644),
+                (os.POSIX_SPAWN_DUP2, stderr_write_fd, 2),
+            ]
+            pid = os.posix_spawn(
+                self.codex_path, cmd, self._child_env, file_actions=file_actions
+            )
+
+            # The child holds dups of these; release our copies.
+            os.close(stdin_read_fd)
+            stdin_read_fd = None
+            os.close(stderr_write_fd)
+            stderr_write_fd = None
+
+            prompt_writer = threading.Thread(
+                target=_write_and_close,
+                args=(stdin_write_fd, prompt.encode("utf-8")),
+                daemon=True,
+            )
+            prompt_writer.start()
+            stderr_reader = threading.Thread(
+                target=_drain_and_close, args=(stderr_read_fd, stderr_buf), daemon=True
+            )
+            stderr_reader.start()
+
+            returncode = _wait_for_exit(pid, cmd, self.timeout)
         finally:
-            if output_path and os.path.exists(output_path):
-                try:
-                    os.remove(output_path)
-                except OSError:
-                    pass
-            if schema_file and os.path.exists(schema_file):
-                try:
-                    os.remove(schema_file)
-                except OSError:
-                    pass
+            # Closing our copies of the child-facing fds lets the readers see
+            # EOF and unblocks the writers if codex never consumed their data.
+            os.close(out_write_fd)
+            if schema_read_fd is not None:
+                os.close(schema_read_fd)
+            if stdin_read_fd is not None:
+                os.close(stdin_read_fd)
+            if stderr_write_fd is not None:
+                os.close(stderr_write_fd)
+            if reader is not None:
+                reader.join()
+            else:
+                os.close(out_read_fd)
+            if schema_writer is not None:
+                schema_writer.join()
+            if prompt_writer is not None:
+                prompt_writer.join()
+            elif stdin_write_fd is not None:
+                os.close(stdin_write_fd)
+            if stderr_reader is not None:
+                stderr_reader.join()
+            elif stderr_read_fd is not None:
+                os.close(stderr_read_fd)
+
+        message = captured.decode("utf-8", errors="replace").strip()
+
+        if returncode != 0:
+            stderr = stderr_buf.decode("utf-8", errors="replace").strip()
+            details = stderr or message or "codex exec failed"
+            raise RuntimeError(details)
+
+        return message
+
+    def _ensure_worker(self) -> subprocess.Popen[bytes]:
+        if self._worker is not None and self._worker.poll() is None:
+            return self._worker
+        self._worker = subprocess.Popen(  # noqa: S603
+            [
+                self.codex_path,
+                "exec",
+                "--proto",
+                "json",
+                "-m",
+                self.model,
+                *self._cmd_prefix,
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=self._child_env,
+        )
+        return self._worker
+
+    def _call_persistent(
+        self, prompt: str, response_model: type[BaseModel] | None
+    ) -> str | None:
+        """Run one prompt through the persistent worker.
+
+        Returns None when the worker cannot be used (spawn failure, protocol
+        error, or an unrecognized response), in which case the caller falls
+        back to a one-shot `codex exec` and the worker is not retried for the
+        lifetime of this instance.
+        """
+        with self._worker_lock:
+            try:
+                worker = self._ensure_worker()
+                request: dict[str, Any] = {"prompt": prompt}
+                if response_model is not None:
+                    request["schema"] = response_model.model_json_schema()
+                worker.stdin.write(json.dumps(request).encode("utf-8") + b"\n")  # type: ignore[union-attr]
+                worker.stdin.flush()  # type: ignore[union-attr]
+                line = _read_worker_line(worker, self.timeout)
+                if not line:
+                    raise RuntimeError("codex worker closed its stdout")
+                response = json.loads(line)
+            except subprocess.TimeoutExpired:
+                # A hung worker still has to honor the call timeout; kill it
+                # so the next call starts from a clean slate.
+                self._reset_worker()
+                raise
+            except (OSError, ValueError, RuntimeError):
+                self._worker_unsupported = True
+                self._reset_worker()
+                return None
+
+            if isinstance(response, str):
+                return response.strip()
+            if isinstance(response, dict):
+                for key in ("message", "last_message", "response", "text"):
+                    value = response.get(key)
+                    if isinstance(value, str):
+                        return value.strip()
+
+            # Unknown framing; don't trust this worker any further.
+            self._worker_unsupported = True
+            self._reset_worker()
+            return None
+
+    def _reset_worker(self) -> None:
+        worker, self._worker = self._worker, None
+        if worker is None:
+            return
+        try:
+            worker.kill()
+            worker.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+    def close(self) -> None:
+        """Terminate the persistent worker, if one is running."""
+        with self._worker_lock:
+            self._reset_worker()
+
+    def __del__(self) -> None:
+        # The interpreter may be shutting down; never raise from a finalizer.
+        with contextlib.suppress(Exception):
+            self._reset_worker()
+
+
+def _prompt_cache_args(messages: str | list[LLMMessage]) -> tuple[str, ...]:
+    """Content-addressed cache key for the stable conversation prefix.
+
+    Consecutive agent-loop calls usually share everything but the newest
+    message; hashing the prefix gives the provider a stable key for KV-cache
+    reuse across turns.
+    """
+    if not isinstance(messages, list) or len(messages) < 2:
+        return ()
+    prefix = _messages_to_prompt(messages[:-1])
+    digest = hashlib.blake2b(prefix.encode("utf-8"), digest_size=16).hexdigest()
+    return ("-c", f'prompt_cache_key="{digest}"')
+
+
+def _read_worker_line(worker: subprocess.Popen[bytes], timeout: float | None) -> bytes:
+    """Read one response line from the worker, honoring the call timeout.
+
+    Reads the raw fd through a selector so the wait can carry a deadline;
+    only one request is ever in flight, so everything up to the first
+    newline is the response.
+    """
+    fd = worker.stdout.fileno()  # type: ignore[union-attr]
+    deadline = None if timeout is None else time.monotonic() + timeout
+    buf = bytearray()
+    with selectors.DefaultSelector() as selector:
+        selector.register(fd, selectors.EVENT_READ)
+        while True:
+            wait = None if deadline is None else deadline - time.monotonic()
+            if (wait is not None and wait <= 0) or not selector.select(wait):
+                raise subprocess.TimeoutExpired(worker.args, timeout or 0)
+            chunk = os.read(fd, 65536)
+            buf += chunk
+            if not chunk or b"\n" in chunk:
+                return bytes(buf)
+
+
+def _wait_for_exit(pid: int, cmd: list[str], timeout: float | None) -> int:
+    """Wait for the spawned codex process, enforcing the optional timeout."""
+    if timeout is None:
+        return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+
+    deadline = time.monotonic() + timeout
+    delay = 0.001
+    while True:
+        waited_pid, status = os.waitpid(pid, os.WNOHANG)
+        if waited_pid == pid:
+            return os.waitstatus_to_exitcode(status)
+        if time.monotonic() >= deadline:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        time.sleep(delay)
+        delay = min(delay * 2, 0.05)
+
+
+def _drain_and_close(fd: int, buffer: bytearray) -> None:
+    try:
+        while chunk := os.read(fd, 65536):
+            buffer += chunk
+    finally:
+        os.close(fd)
+
+
+def _serialize_and_write_schema(fd: int, response_model: type[BaseModel]) -> None:
+    try:
+        data = _model_schema_bytes(response_model)
+    except Exception:
+        os.close(fd)
+        raise
+    _write_and_close(fd, data)
+
+
+def _write_and_close(fd: int, data: bytes) -> None:
+    try:
+        # Payloads up to the pipe capacity go out in this one write; only
+        # larger ones need the sliced loop.
+        written = os.write(fd, data)
+        if written < len(data):
+            view = memoryview(data)[written:]
+            while view:
+                view = view[os.write(fd, view) :]
+    except BrokenPipeError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _dedupe_override_args(overrides: list[str]) -> list[str]:
+    """Collapse duplicate `-c key=value` pairs, keeping the last value.
+
+    List-form overrides are spliced verbatim into argv, so only tokens that
+    form a ``-c key=value`` pair are rewritten; a repeated key keeps its
+    first position but takes its last value. Anything else passes through
+    untouched in its original order.
+    """
+    result: list[str] = []
+    slot_for_key: dict[str, int] = {}
+    index = 0
+    while index < len(overrides):
+        item = overrides[index]
+        pair_value = overrides[index + 1] if index + 1 < len(overrides) else None
+        if item == "-c" and isinstance(pair_value, str) and "=" in pair_value:
+            key = pair_value.partition("=")[0].strip()
+            if key in slot_for_key:
+                result[slot_for_key[key]] = pair_value
+            else:
+                result += ["-c", pair_value]
+                slot_for_key[key] = len(result) - 1
+            index += 2
+            continue
+        if isinstance(item, str):
+            result.append(item)
+        index += 1
+    return result
 
 
 def _format_codex_overrides(
@@ -157,7 +543,7 @@ def _format_codex_overrides(
             continue
         # Let codex parse TOML; encode basic values as JSON for safety.
         try:
-            value_str = json.dumps(value)
+            value_str = _dumps(value).decode("utf-8")
         except TypeError:
             value_str = str(value)
         args += ["-c", f"{key}={value_str}"]
@@ -168,12 +554,12 @@ def _messages_to_prompt(messages: str | list[LLMMessage]) -> str:
     if isinstance(messages, str):
         return messages
 
-    parts: list[str] = []
-    for msg in messages:
-        role = msg.get("role", "user")
+    def _format(msg: LLMMessage) -> str:
+        role = msg.get("role", "user").upper()
         content = msg.get("content", "")
-        if isinstance(content, list):
+        if type(content) is list:
             # Flatten multimodal content into text
-            content = " ".join(str(part) for part in content)
-        parts.append(f"{role.upper()}: {content}")
-    return "\n".join(parts).strip()
+            content = " ".join(map(str, content))
+        return f"{role}: {content}"
+
+    return "\n".join(_format(msg) for msg in messages).strip()
@@ -319,6 +319,54 @@ def test_append_uv_sources_skips_when_present(tmp_path):
     assert _append_uv_sources(pyproject, sources) is False
 
 
+def test_append_uv_sources_preserves_existing_content(tmp_path):
+    pyproject = tmp_path / "pyproject.toml"
+    original = "[project]\nname = \"demo\"\n"
+    pyproject.write_text(original)
+
+    sources = {"crewai": tmp_path / "lib" / "crewai"}
+    assert _append_uv_sources(pyproject, sources) is True
+
+    content = pyproject.read_text()
+    assert content.startswith(original)
+    assert content.endswith("\n")
+
+
+def test_append_uv_sources_missing_pyproject(tmp_path):
+    sources = {"crewai": tmp_path / "lib" / "crewai"}
+    assert _append_uv_sources(tmp_path / "pyproject.toml", sources) is False
+
+
+def test_build_uv_sources_returns_present_packages_in_order(tmp_path):
+    from crewai.cli.local_sources import _build_uv_sources
+
+    (tmp_path / "lib" / "crewai-tools").mkdir(parents=True)
+    (tmp_path / "lib" / "crewai").mkdir()
+    (tmp_path / "lib" / "unrelated").mkdir()
+
+    sources = _build_uv_sources(tmp_path)
+    assert list(sources) == ["crewai", "crewai-tools"]
+    assert sources["crewai"] == tmp_path / "lib" / "crewai"
+    assert _build_uv_sources(tmp_path / "missing") == {}
+
+
+def test_find_local_repo_root_is_cached(tmp_path):
+    from crewai.cli.local_sources import (
+        _find_local_repo_root,
+        _find_local_repo_root_cached,
+    )
+
+    (tmp_path / "lib" / "crewai").mkdir(parents=True)
+    (tmp_path / "lib" / "crewai-tools").mkdir()
+    nested = tmp_path / "a" / "b"
+    nested.mkdir(parents=True)
+
+    _find_local_repo_root_cached.cache_clear()
+    assert _find_local_repo_root(nested) == tmp_path
+    assert _find_local_repo_root(nested) == tmp_path
+    assert _find_local_repo_root_cached.cache_info().hits == 1
+
+
 @mock.patch("crewai.cli.create_crew.create_folder_structure")
 @mock.patch("crewai.cli.create_crew.copy_template")
 @mock.patch("crewai.cli.create_crew.load_env_vars")
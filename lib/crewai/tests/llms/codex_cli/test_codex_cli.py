@@ -0,0 +1,303 @@
+import os
+import stat
+import sys
+import textwrap
+
+import pytest
+from pydantic import BaseModel
+
+from crewai.llms.providers.codex_cli.completion import CodexCLICompletion
+
+
+FAKE_CODEX = textwrap.dedent(
+    """\
+    #!{python}
+    import json
+    import sys
+
+    args = sys.argv[1:]
+
+    def flag(name):
+        return args[args.index(name) + 1] if name in args else None
+
+    if "--proto" in args:
+        # Mimic a codex build without line-protocol support.
+        sys.exit(2)
+
+    prompt = sys.stdin.read()
+    schema_path = flag("--output-schema")
+    schema = ""
+    if schema_path:
+        with open(schema_path, "r") as f:
+            schema = f.read()
+
+    output_path = flag("--output-last-message")
+    if output_path:
+        with open(output_path, "w") as f:
+            f.write("echo: " + prompt)
+            if schema:
+                f.write("\\nschema-title: " + json.loads(schema)["title"])
+    """
+)
+
+
+FAKE_CODEX_WORKER = textwrap.dedent(
+    """\
+    #!{python}
+    import json
+    import os
+    import sys
+
+    if "--proto" not in sys.argv:
+        sys.exit(2)
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        reply = {{"message": f"worker[{{os.getpid()}}]: " + request["prompt"]}}
+        print(json.dumps(reply), flush=True)
+    """
+)
+
+
+@pytest.fixture
+def fake_codex(tmp_path):
+    """A stand-in codex binary that echoes the prompt via --output-last-message."""
+    path = tmp_path / "codex"
+    path.write_text(FAKE_CODEX.format(python=sys.executable))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+@pytest.fixture
+def fake_codex_worker(tmp_path):
+    """A stand-in codex binary that only speaks the JSON-line worker protocol."""
+    path = tmp_path / "codex-worker"
+    path.write_text(FAKE_CODEX_WORKER.format(python=sys.executable))
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+class SimpleResponse(BaseModel):
+    answer: str
+
+
+def test_missing_codex_binary_raises():
+    with pytest.raises(FileNotFoundError):
+        CodexCLICompletion(codex_path="definitely-not-a-real-codex-binary")
+
+
+def test_binary_resolution_is_cached(fake_codex, monkeypatch):
+    from crewai.llms.providers.codex_cli import completion
+
+    completion._resolve_codex_binary.cache_clear()
+    calls = []
+    real_which = completion.shutil.which
+    monkeypatch.setattr(
+        completion.shutil, "which", lambda p: calls.append(p) or real_which(p)
+    )
+
+    first = CodexCLICompletion(codex_path=fake_codex)
+    second = CodexCLICompletion(codex_path=fake_codex)
+    assert calls == [fake_codex]
+    assert first.codex_path == second.codex_path == fake_codex
+
+
+def test_static_cmd_prefix_is_precomputed(fake_codex):
+    llm = CodexCLICompletion(
+        codex_path=fake_codex,
+        codex_cd="/tmp",
+        codex_sandbox="read-only",
+        codex_full_auto=True,
+        codex_add_dir=["/srv/data"],
+        codex_config_overrides={"model_reasoning_effort": "low"},
+    )
+    assert llm._cmd_prefix == (
+        "--cd",
+        "/tmp",
+        "--skip-git-repo-check",
+        "--sandbox",
+        "read-only",
+        "--full-auto",
+        "--add-dir",
+        "/srv/data",
+        "-c",
+        'model_reasoning_effort="low"',
+    )
+    # The prefix is reused verbatim, so calls still succeed with flags set.
+    assert llm.call("hi") == "echo: hi"
+
+
+def test_add_dirs_and_override_keys_are_deduplicated(fake_codex, tmp_path):
+    real_dir = tmp_path / "data"
+    real_dir.mkdir()
+    alias = tmp_path / "alias"
+    alias.symlink_to(real_dir)
+
+    llm = CodexCLICompletion(
+        codex_path=fake_codex,
+        codex_add_dir=[str(real_dir), str(alias), str(real_dir)],
+        codex_config_overrides=[
+            "-c",
+            "sandbox_mode=a",
+            "-c",
+            "other=1",
+            "-c",
+            "sandbox_mode=b",
+        ],
+    )
+    assert llm.codex_add_dir == [str(real_dir)]
+    # Repeated keys keep their first position but take the last value, and
+    # the -c pairing survives so the argv splice stays valid for codex.
+    assert llm.codex_config_overrides == ["-c", "sandbox_mode=b", "-c", "other=1"]
+    assert llm._cmd_prefix[-4:] == ("-c", "sandbox_mode=b", "-c", "other=1")
+
+
+def test_call_returns_message_from_output_pipe(fake_codex):
+    llm = CodexCLICompletion(codex_path=fake_codex)
+    assert llm.call("hello codex") == "echo: hello codex"
+
+
+def test_call_formats_message_list_as_prompt(fake_codex):
+    llm = CodexCLICompletion(codex_path=fake_codex)
+    messages = [
+        {"role": "system", "content": "be brief"},
+        {"role": "user", "content": "hi"},
+    ]
+    assert llm.call(messages) == "echo: SYSTEM: be brief\nUSER: hi"
+
+
+def test_call_flattens_multimodal_content(fake_codex):
+    llm = CodexCLICompletion(codex_path=fake_codex)
+    messages = [{"role": "user", "content": ["look at", "this"]}]
+    assert llm.call(messages) == "echo: USER: look at this"
+
+
+def test_call_passes_response_model_schema(fake_codex):
+    llm = CodexCLICompletion(codex_path=fake_codex)
+    result = llm.call("hi", response_model=SimpleResponse)
+    assert result.endswith("schema-title: SimpleResponse")
+
+
+def test_call_handles_large_payloads_without_deadlock(fake_codex):
+    # Larger than a pipe buffer (64KB on Linux) in both directions.
+    llm = CodexCLICompletion(codex_path=fake_codex)
+    prompt = "x" * 200_000
+    assert llm.call(prompt) == f"echo: {prompt}"
+
+
+def test_child_env_is_pruned_and_snapshotted(fake_codex, monkeypatch):
+    monkeypatch.setenv("SOME_CI_NOISE", "x")
+    monkeypatch.setenv("CODEX_HOME", "/opt/codex")
+    llm = CodexCLICompletion(codex_path=fake_codex)
+
+    assert "SOME_CI_NOISE" not in llm._child_env
+    assert llm._child_env["CODEX_HOME"] == "/opt/codex"
+    assert "PATH" in llm._child_env
+
+    # Snapshotted at construction: later mutations don't leak into children.
+    monkeypatch.setenv("CODEX_HOME", "/elsewhere")
+    assert llm._child_env["CODEX_HOME"] == "/opt/codex"
+    assert llm.call("hi") == "echo: hi"
+
+
+def test_prompt_cache_key_tracks_conversation_prefix():
+    from crewai.llms.providers.codex_cli.completion import _prompt_cache_args
+
+    history = [
+        {"role": "system", "content": "be brief"},
+        {"role": "user", "content": "hi"},
+    ]
+    same_prefix = _prompt_cache_args([*history, {"role": "user", "content": "more"}])
+    also_same = _prompt_cache_args([*history, {"role": "user", "content": "other"}])
+    different = _prompt_cache_args(
+        [{"role": "system", "content": "verbose"}, *history]
+    )
+
+    assert same_prefix[0] == "-c"
+    assert same_prefix == also_same
+    assert different != same_prefix
+    # Strings and single messages have no stable prefix to key on.
+    assert _prompt_cache_args("plain prompt") == ()
+    assert _prompt_cache_args([{"role": "user", "content": "hi"}]) == ()
+
+
+def test_call_enforces_timeout(tmp_path):
+    import subprocess
+
+    path = tmp_path / "codex"
+    path.write_text(f"#!{sys.executable}\nimport time\ntime.sleep(30)\n")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+
+    llm = CodexCLICompletion(codex_path=str(path), timeout=0.3)
+    with pytest.raises(subprocess.TimeoutExpired):
+        llm.call("hi")
+
+
+def test_call_raises_runtime_error_with_stderr(tmp_path):
+    path = tmp_path / "codex"
+    path.write_text(
+        f"#!{sys.executable}\nimport sys\nsys.stdin.read()\n"
+        'print("boom", file=sys.stderr)\nsys.exit(2)\n'
+    )
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+
+    llm = CodexCLICompletion(codex_path=str(path))
+    with pytest.raises(RuntimeError, match="boom"):
+        llm.call("hi")
+
+
+def test_persistent_worker_reuses_one_process(fake_codex_worker, monkeypatch):
+    monkeypatch.setenv("CREWAI_CODEX_PERSISTENT", "1")
+    llm = CodexCLICompletion(codex_path=fake_codex_worker)
+    try:
+        first = llm.call("one")
+        second = llm.call("two")
+    finally:
+        llm.close()
+
+    assert first.endswith(": one")
+    assert second.endswith(": two")
+    # Same pid in both replies means the worker was spawned exactly once.
+    assert first.split(":")[0] == second.split(":")[0]
+    assert llm._worker is None
+
+
+def test_persistent_mode_falls_back_to_one_shot(fake_codex, monkeypatch):
+    monkeypatch.setenv("CREWAI_CODEX_PERSISTENT", "1")
+    llm = CodexCLICompletion(codex_path=fake_codex)
+    # The fake binary rejects --proto, so the call degrades to one-shot exec.
+    assert llm.call("hi") == "echo: hi"
+    assert llm._worker is None
+    # The failed protocol is remembered: no further worker spawns happen.
+    assert llm._worker_unsupported is True
+    monkeypatch.setattr(
+        llm, "_call_persistent", lambda *a, **k: pytest.fail("worker retried")
+    )
+    assert llm.call("again") == "echo: again"
+
+
+def test_persistent_worker_honors_timeout(tmp_path, monkeypatch):
+    import subprocess
+
+    path = tmp_path / "codex"
+    path.write_text(
+        f"#!{sys.executable}\nimport sys, time\n"
+        'if "--proto" not in sys.argv:\n    sys.exit(2)\n'
+        "sys.stdin.readline()\ntime.sleep(30)\n"
+    )
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+
+    monkeypatch.setenv("CREWAI_CODEX_PERSISTENT", "1")
+    llm = CodexCLICompletion(codex_path=str(path), timeout=0.3)
+    with pytest.raises(subprocess.TimeoutExpired):
+        llm.call("hi")
+    # The hung worker was killed so the next call starts clean.
+    assert llm._worker is None
+
+
+def test_call_leaves_no_temp_files_behind(fake_codex, tmp_path, monkeypatch):
+    monkeypatch.setenv("TMPDIR", str(tmp_path))
+    llm = CodexCLICompletion(codex_path=fake_codex)
+    llm.call("hi", response_model=SimpleResponse)
+    leftovers = [p for p in tmp_path.iterdir() if p.name != os.path.basename(fake_codex)]
+    assert leftovers == []